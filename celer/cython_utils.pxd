@@ -25,6 +25,8 @@ cdef void faxpy(int *, floating *, floating *, int *, floating *, int *) nogil
 cdef floating fnrm2(int * , floating *, int *) nogil
 cdef void fcopy(int *, floating *, int *, floating *, int *) nogil
 cdef void fscal(int *, floating *, floating *, int *) nogil
+cdef void fgemv(char *, int *, int *, floating *, floating *, int *,
+                floating *, int *, floating *, floating *, int *) nogil
 
 cdef void fposv(char *, int *, int *, floating *,
                      int *, floating *, int *, int *) nogil
@@ -40,6 +42,10 @@ cpdef void compute_Xw(
     floating[:], int[:], int[:], floating[:])
 
 
+cpdef floating compute_dnorm_Xty(
+    bint, floating[:], floating[::1, :], floating[:], int[:], int[:], bint)
+
+
 cpdef void compute_norms_X_col(
     bint, floating[:], int, floating[::1, :],
     floating[:], int[:], int[:], floating[:])
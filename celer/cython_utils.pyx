@@ -8,6 +8,7 @@ cimport numpy as np
 
 from scipy.linalg.cython_blas cimport ddot, dasum, daxpy, dnrm2, dcopy, dscal
 from scipy.linalg.cython_blas cimport sdot, sasum, saxpy, snrm2, scopy, sscal
+from scipy.linalg.cython_blas cimport dgemv, sgemv
 from scipy.linalg.cython_lapack cimport sposv, dposv
 from libc.math cimport fabs, log, exp, sqrt
 from numpy.math cimport INFINITY
@@ -67,6 +68,15 @@ cdef void fscal(int * n, floating * alpha, floating * x,
         sscal(n, alpha, x, incx)
 
 
+cdef void fgemv(char * trans, int * m, int * n, floating * alpha,
+                floating * a, int * lda, floating * x, int * incx,
+                floating * beta, floating * y, int * incy) nogil:
+    if floating is double:
+        dgemv(trans, m, n, alpha, a, lda, x, incx, beta, y, incy)
+    else:
+        sgemv(trans, m, n, alpha, a, lda, x, incx, beta, y, incy)
+
+
 cdef void fposv(char * uplo, int * n, int * nrhs, floating * a,
                      int * lda, floating * b, int * ldb, int * info) nogil:
     if floating is double:
@@ -311,6 +321,37 @@ cpdef void compute_norms_X_col(
             norms_X_col[j] = fnrm2(&n_samples, &X[0, j], &inc)
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef floating compute_dnorm_Xty(
+        bint is_sparse, floating[:] y, floating[::1, :] X,
+        floating[:] X_data, int[:] X_indices, int[:] X_indptr,
+        bint positive):
+    # max_j X_j^T y if positive else max_j |X_j^T y|, without storing X^T y
+    cdef int i, j, startptr, endptr
+    cdef floating tmp
+    cdef floating dnorm = 0.
+    cdef int n_samples = y.shape[0]
+    cdef int n_features = X_indptr.shape[0] - 1 if is_sparse else X.shape[1]
+
+    for j in range(n_features):
+        if is_sparse:
+            startptr = X_indptr[j]
+            endptr = X_indptr[j + 1]
+            tmp = 0.
+            for i in range(startptr, endptr):
+                tmp += X_data[i] * y[X_indices[i]]
+        else:
+            tmp = fdot(&n_samples, &X[0, j], &inc, &y[0], &inc)
+
+        if not positive:
+            tmp = fabs(tmp)
+        if j == 0 or tmp > dnorm:
+            dnorm = tmp
+    return dnorm
+
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
@@ -6,7 +6,10 @@
 import warnings
 import numpy as np
 
+from itertools import chain
+from joblib import Parallel, delayed, effective_n_jobs
 from scipy import sparse
+from scipy.sparse.linalg import LinearOperator, svds
 from numpy.linalg import norm
 from sklearn.utils import check_array
 from sklearn.exceptions import ConvergenceWarning
@@ -14,20 +17,26 @@ from sklearn.exceptions import ConvergenceWarning
 from .lasso_fast import celer
 from .group_fast import celer_grp, dscal_grp
 # TODO dnorm better name?
-from .cython_utils import compute_norms_X_col, compute_Xw
-from .multitask_fast import celer_mtl
+from .cython_utils import compute_norms_X_col, compute_Xw, compute_dnorm_Xty
+from .multitask_fast import celer_mtl, compute_norms_XtY_X_col
 from .PN_logreg import newton_celer
 
 LASSO = 0
 LOGREG = 1
 GRPLASSO = 2
 
+# above this size, spectral norms of sparse groups are computed iteratively
+# rather than from their dense Gram matrix, whose O(size^3) eigensolve only
+# dominates for groups of a few hundred features
+MAX_GRAM_GRP_SIZE = 256
+
 
 def celer_path(X, y, pb, eps=1e-3, n_alphas=100, alphas=None,
                coef_init=None, max_iter=20, gap_freq=10, max_epochs=50000,
                p0=10, verbose=0, verbose_inner=0, tol=1e-6, prune=0,
                groups=None, return_thetas=False, use_PN=False, X_offset=None,
-               X_scale=None, return_n_iter=False, positive=False):
+               X_scale=None, return_n_iter=False, positive=False,
+               n_jobs=None):
     r"""Compute optimization path with Celer as inner solver.
 
     With `n = len(y)` the number of samples, the losses are:
@@ -120,6 +129,14 @@ def celer_path(X, y, pb, eps=1e-3, n_alphas=100, alphas=None,
     positive : bool, optional (default=False)
         If True and pb == "lasso", forces the coefficients to be positive.
 
+    n_jobs : int or None, optional (default=None)
+        Number of threads used to compute the norms of the groups, for
+        pb == "grouplasso" only.
+        ``None`` means 1 unless in a :obj:`joblib.parallel_backend` context.
+        ``-1`` means using all processors. Sparse groups with more than
+        ``MAX_GRAM_GRP_SIZE`` columns get no speedup, because scipy's
+        ARPACK wrapper holds a global lock.
+
     Returns
     -------
     alphas : array, shape (n_alphas,)
@@ -170,70 +187,73 @@ def celer_path(X, y, pb, eps=1e-3, n_alphas=100, alphas=None,
         X_sparse_scaling = np.asarray(X_sparse_scaling, dtype=X.dtype)
     else:
         X_sparse_scaling = np.zeros(n_features, dtype=X.dtype)
+    has_scaling = bool(X_sparse_scaling.any())
+
+    if is_sparse:
+        X_dense = np.empty([1, 1], order='F', dtype=X.data.dtype)
+        X_data = X.data
+        X_indptr = X.indptr
+        X_indices = X.indices
+    else:
+        X_dense = X
+        X_data = np.empty([1], dtype=X.dtype)
+        X_indices = np.empty([1], dtype=np.int32)
+        X_indptr = np.empty([1], dtype=np.int32)
+
+    Xty = None
+    if pb != GRPLASSO and coef_init is None:
+        # used both for alpha_max and for the first dual point when w = 0
+        Xty = X.T @ y
+
+    positive_lasso = positive and pb == LASSO
+    # 0 is a solution for all alphas above alpha_max = dnorm_Xty / dual_scale
+    dual_scale = n_samples if pb == LASSO else 2.
+    # only computed when needed: for alpha_max, or when w = 0 along the path
+    dnorm_Xty = None
 
     if alphas is None:
         # TODO this is wrong is X_sparse_scaling is used
-        if pb == LASSO:
-            if positive:
-                alpha_max = np.max(X.T.dot(y)) / n_samples
-            else:
-                alpha_max = norm(X.T @ y, ord=np.inf) / n_samples
-        elif pb == LOGREG:
-            alpha_max = norm(X.T @ y, ord=np.inf) / 2.
+        if pb in (LASSO, LOGREG):
+            dnorm_Xty = _dnorm_Xty(
+                Xty, y, is_sparse, X_dense, X_data, X_indices, X_indptr,
+                positive_lasso)
+            alpha_max = dnorm_Xty / dual_scale
         elif pb == GRPLASSO:
             # TODO compute it with dscal to handle centering sparse
-            alpha_max = 0
-            for g in range(n_groups):
-                X_g = X[:, grp_indices[grp_ptr[g]:grp_ptr[g + 1]]]
-                alpha_max = max(alpha_max, norm(X_g.T @ y, ord=2))
-            alpha_max /= n_samples
-
-        alphas = alpha_max * np.geomspace(1, eps, n_alphas,
-                                          dtype=X.dtype)
+            Xty = X.T @ y
+            # squared norms of X_g.T @ y for all groups at once:
+            norms2_Xty_grp = np.add.reduceat(
+                Xty[grp_indices] ** 2, grp_ptr[:-1])
+            alpha_max = np.sqrt(np.max(norms2_Xty_grp)) / n_samples
+
+        # geometric grid built directly in the dtype of X
+        log_alphas = np.linspace(0., np.log(eps), n_alphas, dtype=X.dtype)
+        alphas = (alpha_max * np.exp(log_alphas)).astype(X.dtype, copy=False)
     else:
         alphas = np.sort(alphas)[::-1]
 
     n_alphas = len(alphas)
 
-    coefs = np.zeros((n_features, n_alphas), order='F', dtype=X.dtype)
-    thetas = np.zeros((n_alphas, n_samples), dtype=X.dtype)
-    dual_gaps = np.zeros(n_alphas)
+    # coefs are mostly sparse along the path: only store their support
+    coefs_rows, coefs_cols, coefs_data = [], [], []
+    if return_thetas:
+        thetas = np.zeros((n_alphas, n_samples), dtype=X.dtype)
+    dual_gaps = np.zeros(n_alphas, dtype=X.dtype)
 
     if return_n_iter:
         n_iters = np.zeros(n_alphas, dtype=int)
 
-    if is_sparse:
-        X_dense = np.empty([1, 1], order='F', dtype=X.data.dtype)
-        X_data = X.data
-        X_indptr = X.indptr
-        X_indices = X.indices
-    else:
-        X_dense = X
-        X_data = np.empty([1], dtype=X.dtype)
-        X_indices = np.empty([1], dtype=np.int32)
-        X_indptr = np.empty([1], dtype=np.int32)
-
     if pb == GRPLASSO:
         # TODO this must be included in compute_norm_Xcols when centering
-        norms_X_grp = np.zeros(n_groups, dtype=X_dense.dtype)
-        for g in range(n_groups):
-            X_g = X[:, grp_indices[grp_ptr[g]:grp_ptr[g + 1]]]
-            if is_sparse:
-                gram = (X_g.T @ X_g).todense()
-                # handle centering:
-                for j1 in range(grp_ptr[g], grp_ptr[g + 1]):
-                    for j2 in range(grp_ptr[g], grp_ptr[g + 1]):
-                        gram[j1 - grp_ptr[g], j2 - grp_ptr[g]] += \
-                            X_sparse_scaling[j1] * \
-                            X_sparse_scaling[j2] * n_samples - \
-                            X_sparse_scaling[j1] * \
-                            X_data[X_indptr[j2]:X_indptr[j2+1]].sum() - \
-                            X_sparse_scaling[j2] * \
-                            X_data[X_indptr[j1]:X_indptr[j1+1]].sum()
-
-                norms_X_grp[g] = np.sqrt(norm(gram, ord=2))
-            else:
-                norms_X_grp[g] = norm(X_g, ord=2)
+        X_col_sums = np.asarray(X.sum(axis=0)).ravel() if is_sparse else None
+        # groups are independent: split them in one chunk per job
+        n_chunks = min(effective_n_jobs(n_jobs), n_groups)
+        bounds = np.linspace(0, n_groups, n_chunks + 1).astype(int)
+        norms_X_grp = np.concatenate(
+            Parallel(n_jobs=n_chunks, require="sharedmem")(
+                delayed(_compute_norms_X_grp)(
+                    X, grp_ptr, grp_indices, X_sparse_scaling, X_col_sums,
+                    bounds[i], bounds[i + 1]) for i in range(n_chunks)))
     else:
         # TODO harmonize names
         norms_X_col = np.zeros(n_features, dtype=X_dense.dtype)
@@ -241,6 +261,11 @@ def celer_path(X, y, pb, eps=1e-3, n_alphas=100, alphas=None,
             is_sparse, norms_X_col, n_samples, X_dense, X_data,
             X_indices, X_indptr, X_sparse_scaling)
 
+    # y - Xw for Lasso, Xw for Logreg, kept in sync with w by the solvers:
+    Xw = np.empty(n_samples, dtype=X.dtype)
+    # support of the previous solution, set after each alpha
+    support = None
+
     # do not skip alphas[0], it is not always alpha_max
     for t in range(n_alphas):
         alpha = alphas[t]
@@ -250,44 +275,73 @@ def celer_path(X, y, pb, eps=1e-3, n_alphas=100, alphas=None,
             print(to_print)
             print("#" * len(to_print))
         if t > 0:
-            w = coefs[:, t - 1].copy()
-            theta = thetas[t - 1].copy()
-            p0 = max(len(np.where(w != 0)[0]), 1)
+            # w and theta are the previous solution, modified in place by
+            # the solver. Its support was computed when storing it in coefs
+            p0 = max(len(support), 1)
         else:
             if coef_init is not None:
                 w = coef_init.copy()
                 p0 = max((w != 0.).sum(), p0)
-                # y - Xw for Lasso, Xw for Logreg:
-                Xw = np.zeros(n_samples, dtype=X.dtype)
+                Xw.fill(0.)
                 compute_Xw(
-                    is_sparse, pb, Xw, w, y, X_sparse_scaling.any(), X_dense,
+                    is_sparse, pb, Xw, w, y, has_scaling, X_dense,
                     X_data, X_indices, X_indptr, X_sparse_scaling)
             else:
                 w = np.zeros(n_features, dtype=X.dtype)
-                Xw = np.zeros(n_samples, X.dtype) if pb == LOGREG else y.copy()
+                if pb == LOGREG:
+                    Xw.fill(0.)
+                else:
+                    np.copyto(Xw, y)
 
             if pb == LASSO:
-                theta = Xw / np.linalg.norm(X.T.dot(Xw), ord=np.inf)
+                if coef_init is None:
+                    # Xw = y, hence X.T @ Xw = Xty
+                    theta = y / norm(Xty, ord=np.inf)
+                else:
+                    XtXw = X.T.dot(Xw)
+                    theta = Xw / np.linalg.norm(XtXw, ord=np.inf)
             elif pb == GRPLASSO:
                 theta = Xw.copy()
                 scal = dscal_grp(
                     is_sparse, theta, grp_ptr, grp_indices, X_dense,
                     X_data, X_indices, X_indptr, X_sparse_scaling,
-                    len(grp_ptr) - 1, np.zeros(1, dtype=np.int32),
-                    X_sparse_scaling.any())
+                    n_groups, np.zeros(1, dtype=np.int32),
+                    has_scaling)
                 theta /= scal
             elif pb == LOGREG:
-                theta = y / (1 + np .exp(y * Xw)) / alpha
-                theta /= np.linalg.norm(X.T @ theta, ord=np.inf)
+                if coef_init is None:
+                    # Xw = 0, hence theta = y / (2 alpha) before rescaling
+                    theta = y / norm(Xty, ord=np.inf)
+                else:
+                    theta = y / (1 + np .exp(y * Xw)) / alpha
+                    dnorm_Xt_theta = norm(X.T @ theta, ord=np.inf)
+                    theta /= dnorm_Xt_theta
+        if t > 0:
+            w_is_zero = len(support) == 0
+        else:
+            w_is_zero = coef_init is None or not w.any()
+
+        skip_solver = False
+        if pb in (LASSO, LOGREG) and not has_scaling and w_is_zero:
+            if dnorm_Xty is None:
+                dnorm_Xty = _dnorm_Xty(
+                    Xty, y, is_sparse, X_dense, X_data, X_indices, X_indptr,
+                    positive_lasso)
+            skip_solver = alpha >= dnorm_Xty / dual_scale
+
         # celer modifies w, Xw, and theta in place:
-        if pb == GRPLASSO:  # TODO this if else scheme is complicated
+        if skip_solver:
+            # KKT conditions hold at w = 0 for this alpha, with a zero
+            # duality gap: skip the solver
+            theta = y / (dual_scale * alpha)
+            sol = w, theta, np.zeros(1, dtype=X.dtype)
+        elif pb == GRPLASSO:  # TODO this if else scheme is complicated
             sol = celer_grp(
                 is_sparse, LASSO, X_dense, grp_indices, grp_ptr, X_data,
                 X_indices,
                 X_indptr, X_sparse_scaling, y, alpha, w, Xw, theta,
                 norms_X_grp, tol, max_iter, max_epochs, gap_freq, p0=p0,
                 prune=prune, verbose=verbose)
-            coefs[:, t], thetas[t], dual_gaps[t] = sol[0], sol[1], sol[2][-1]
         elif pb == LASSO or (pb == LOGREG and not use_PN):
             sol = celer(
                 is_sparse, pb,
@@ -302,7 +356,13 @@ def celer_path(X, y, pb, eps=1e-3, n_alphas=100, alphas=None,
                 max_iter, verbose, verbose_inner, tol, prune, p0, True, K=6,
                 growth=2, blitz_sc=False)
 
-        coefs[:, t], thetas[t], dual_gaps[t] = sol[0], sol[1], sol[2][-1]
+        support = np.flatnonzero(sol[0])
+        coefs_rows.append(support)
+        coefs_cols.append(np.full(len(support), t))
+        coefs_data.append(sol[0][support])
+        dual_gaps[t] = sol[2][-1]
+        if return_thetas:
+            thetas[t] = sol[1]
         if return_n_iter:
             n_iters[t] = len(sol[2])
 
@@ -313,6 +373,14 @@ def celer_path(X, y, pb, eps=1e-3, n_alphas=100, alphas=None,
                 'Fitting data with very small alpha causes precision issues.',
                 ConvergenceWarning)
 
+    if n_alphas == 0:
+        coefs = np.zeros((n_features, 0), order='F', dtype=X.dtype)
+    else:
+        coefs = sparse.csc_matrix(
+            (np.concatenate(coefs_data),
+             (np.concatenate(coefs_rows), np.concatenate(coefs_cols))),
+            shape=(n_features, n_alphas), dtype=X.dtype).toarray(order='F')
+
     results = alphas, coefs, dual_gaps
     if return_thetas:
         results += (thetas,)
@@ -329,18 +397,91 @@ def _grp_converter(groups, n_features):
             raise ValueError("n_features (%d) is not a multiple of the desired"
                              " group size (%d)" % (n_features, grp_size))
         n_groups = n_features // grp_size
-        grp_ptr = grp_size * np.arange(n_groups + 1)
-        grp_indices = np.arange(n_features)
+        grp_ptr = grp_size * np.arange(n_groups + 1, dtype=np.int32)
+        grp_indices = np.arange(n_features, dtype=np.int32)
     elif isinstance(groups, list) and isinstance(groups[0], int):
-        grp_indices = np.arange(n_features).astype(np.int32)
-        grp_ptr = np.cumsum(np.hstack([[0], groups]))
+        grp_indices = np.arange(n_features, dtype=np.int32)
+        grp_ptr = np.cumsum(np.hstack([[0], groups]), dtype=np.int32)
     elif isinstance(groups, list) and isinstance(groups[0], list):
-        grp_sizes = np.array([len(ls) for ls in groups])
-        grp_ptr = np.cumsum(np.hstack([[0], grp_sizes]))
-        grp_indices = np.array([idx for grp in groups for idx in grp])
+        grp_ptr = np.zeros(len(groups) + 1, dtype=np.int32)
+        grp_ptr[1:] = np.fromiter(map(len, groups), dtype=np.int32,
+                                  count=len(groups))
+        np.cumsum(grp_ptr, out=grp_ptr)
+        grp_indices = np.fromiter(chain.from_iterable(groups),
+                                  dtype=np.int32, count=grp_ptr[-1])
     else:
         raise ValueError("Unsupported group format.")
-    return grp_ptr.astype(np.int32), grp_indices.astype(np.int32)
+    if np.any(np.diff(grp_ptr) <= 0):
+        raise ValueError("Groups must not be empty.")
+    # no copy when the arrays are already built as int32
+    return (grp_ptr.astype(np.int32, copy=False),
+            grp_indices.astype(np.int32, copy=False))
+
+
+def _dnorm_Xty(Xty, y, is_sparse, X_dense, X_data, X_indices, X_indptr,
+               positive):
+    """max_j X_j^T y if positive, else max_j |X_j^T y|. When Xty is None,
+    X.T @ y is streamed instead of being stored."""
+    if Xty is not None:
+        return np.max(Xty) if positive else norm(Xty, ord=np.inf)
+    return compute_dnorm_Xty(
+        is_sparse, y, X_dense, X_data, X_indices, X_indptr, positive)
+
+
+def _compute_norms_X_grp(X, grp_ptr, grp_indices, X_sparse_scaling,
+                         X_col_sums, first_grp, last_grp):
+    """Spectral norms of (centered) groups of X, for groups first_grp to
+    last_grp - 1."""
+    n_samples = X.shape[0]
+    is_sparse = sparse.issparse(X)
+    norms_X_grp = np.zeros(last_grp - first_grp, dtype=X.dtype)
+    for g in range(first_grp, last_grp):
+        grp_g = grp_indices[grp_ptr[g]:grp_ptr[g + 1]]
+        scaling_g = X_sparse_scaling[grp_g]
+        # for sparse X, slicing copies only the nnz of the group, and scipy's
+        # sparse product then sums duplicate entries of non canonical CSC
+        X_g = X[:, grp_g]
+        if is_sparse and len(grp_g) > MAX_GRAM_GRP_SIZE:
+            # power iterations on the (implicitly centered) sparse group
+            norm_g = _sparse_grp_norm(X_g, scaling_g)
+        elif is_sparse:
+            gram = (X_g.T @ X_g).toarray()
+            # handle centering:
+            col_sums_g = X_col_sums[grp_g]
+            gram += n_samples * np.outer(scaling_g, scaling_g) - \
+                np.outer(scaling_g, col_sums_g) - \
+                np.outer(col_sums_g, scaling_g)
+
+            norm_g = np.sqrt(norm(gram, ord=2))
+        else:
+            # largest eigenvalue of the small group Gram matrix, cheaper
+            # than the SVD performed by norm(X_g, ord=2)
+            eig_max = np.linalg.eigvalsh(X_g.T @ X_g)[-1]
+            norm_g = np.sqrt(max(eig_max, 0.))
+        norms_X_grp[g - first_grp] = norm_g
+    return norms_X_grp
+
+
+def _sparse_grp_norm(X_g, X_g_scaling):
+    """Spectral norm of X_g - X_g_scaling[None, :] for a sparse group X_g."""
+    if min(X_g.shape) == 1:
+        # rank one, and too small for ARPACK
+        return norm(X_g.toarray() - X_g_scaling)
+
+    def matvec(v):
+        v = v.ravel()
+        return X_g @ v - X_g_scaling @ v
+
+    def rmatvec(u):
+        u = u.ravel()
+        return X_g.T @ u - X_g_scaling * u.sum()
+
+    X_g_centered = LinearOperator(
+        X_g.shape, matvec=matvec, rmatvec=rmatvec, dtype=X_g.dtype)
+    # fixed starting vector (ARPACK iterates on the smaller side) for
+    # reproducible norms, hence reproducible step sizes and paths
+    v0 = np.ones(min(X_g.shape), dtype=X_g.dtype)
+    return svds(X_g_centered, k=1, v0=v0, return_singular_vectors=False)[0]
 
 
 # TODO put this in logreg_path with solver variable
@@ -376,27 +517,38 @@ def mtl_path(
     # TODO check Y is fortran too
     n_samples, n_features = X.shape
     n_tasks = Y.shape[1]
+    Y = np.asfortranarray(Y)
+
     if alphas is None:
-        alpha_max = np.max(norm(X.T @ Y, ord=2, axis=1)) / n_samples
-        alphas = alpha_max * \
-            np.geomspace(1, eps, n_alphas, dtype=X.dtype)
+        # alpha_max and norms_X_col are computed in a single pass over X
+        norms_XtY = np.zeros(n_features, dtype=X.dtype)
+        norms_X_col = np.zeros(n_features, dtype=X.dtype)
+        compute_norms_XtY_X_col(X, Y, norms_XtY, norms_X_col)
+        alpha_max = np.max(norms_XtY) / n_samples
+        # geometric grid built directly in the dtype of X
+        log_alphas = np.linspace(0., np.log(eps), n_alphas, dtype=X.dtype)
+        alphas = (alpha_max * np.exp(log_alphas)).astype(X.dtype, copy=False)
     else:
         alphas = np.sort(alphas)[::-1]
+        norms_X_col = np.linalg.norm(X, axis=0)
 
     n_alphas = len(alphas)
 
-    if coef_init is None:
-        coefs = np.zeros((n_features, n_tasks, n_alphas), order="F",
-                         dtype=X.dtype)
-    else:
-        coefs = np.swapaxes(coef_init, 0, 1).copy('F')
-    thetas = np.zeros((n_alphas, n_samples, n_tasks), dtype=X.dtype)
-    gaps = np.zeros(n_alphas)
+    # stored directly with the returned layout, avoiding a final swap + copy
+    coefs = np.zeros((n_tasks, n_features, n_alphas), order="F",
+                     dtype=X.dtype)
+    if return_thetas:
+        thetas = np.zeros((n_alphas, n_samples, n_tasks), dtype=X.dtype)
+    gaps = np.zeros(n_alphas, dtype=X.dtype)
 
-    norms_X_col = np.linalg.norm(X, axis=0)
-    Y = np.asfortranarray(Y)
     R = Y.copy(order='F')
     theta = np.zeros_like(R, order='F')
+    # W is modified in place by celer_mtl and warm starts the next alpha.
+    # Its rows must be contiguous: it is C-ordered, unlike coefs.
+    if coef_init is None:
+        W = np.zeros((n_features, n_tasks), dtype=X.dtype)
+    else:
+        W = coef_init[:, :, 0].T.copy()
 
     # do not skip alphas[0], it is not always alpha_max
     for t in range(n_alphas):
@@ -405,10 +557,8 @@ def mtl_path(
             print("##### Computing %dth alpha" % (t + 1))
             print("#" * 60)
         if t > 0:
-            W = coefs[:, :, t - 1].copy()
-            p_t = max(len(np.where(W[:, 0] != 0)[0]), p0)
+            p_t = max(np.count_nonzero(W[:, 0]), p0)
         else:
-            W = coefs[:, :, t].copy()
             p_t = 10
 
         alpha = alphas[t]
@@ -419,9 +569,9 @@ def mtl_path(
             verbose=verbose_inner, use_accel=use_accel, gap_freq=gap_freq,
             K=K)
 
-        coefs[:, :, t], thetas[t], gaps[t] = sol[0], sol[1], sol[2]
-
-    coefs = np.swapaxes(coefs, 0, 1).copy('F')
+        coefs[:, :, t], gaps[t] = sol[0].T, sol[2]
+        if return_thetas:
+            thetas[t] = sol[1]
 
     if return_thetas:
         return alphas, coefs, gaps, thetas
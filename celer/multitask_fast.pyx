@@ -6,7 +6,7 @@ import numpy as np
 from cython cimport floating
 from libc.math cimport fabs, sqrt
 
-from .cython_utils cimport fscal, fcopy, fnrm2, fdot, faxpy
+from .cython_utils cimport fscal, fcopy, fnrm2, fdot, faxpy, fgemv
 from .cython_utils cimport LASSO, create_accel_pt
 
 ctypedef np.uint8_t uint8
@@ -124,6 +124,37 @@ cdef floating primal_mtl(
     return p_obj
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef void compute_norms_XtY_X_col(
+        floating[::1, :] X, floating[::1, :] Y, floating[:] norms_XtY,
+        floating[:] norms_X_col):
+    # single sweep over the columns of X: each column is used for X_j^T Y
+    # (one gemv for all tasks) and for its norm while it is still in cache
+    cdef int n_samples = X.shape[0]
+    cdef int n_features = X.shape[1]
+    cdef int n_tasks = Y.shape[1]
+    cdef int inc = 1
+    cdef int j
+    cdef floating one = 1.
+    cdef floating zero = 0.
+    cdef char * char_T = 'T'
+
+    if floating is double:
+        dtype = np.float64
+    else:
+        dtype = np.float32
+
+    cdef floating[:] Xj_Y = np.empty(n_tasks, dtype=dtype)
+
+    for j in range(n_features):
+        fgemv(char_T, &n_samples, &n_tasks, &one, &Y[0, 0], &n_samples,
+              &X[0, j], &inc, &zero, &Xj_Y[0], &inc)
+        norms_XtY[j] = fnrm2(&n_tasks, &Xj_Y[0], &inc)
+        norms_X_col[j] = fnrm2(&n_samples, &X[0, j], &inc)
+
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 @cython.cdivision(True)
@@ -8,6 +8,7 @@ from itertools import product
 
 import numpy as np
 from numpy.linalg import norm
+from scipy import sparse
 
 import pytest
 
@@ -19,6 +20,7 @@ from sklearn.linear_model import (LassoCV as sklearn_LassoCV,
                                   LogisticRegression as sklearn_Logreg)
 
 from celer import celer_path
+from celer.cython_utils import compute_dnorm_Xty
 from celer.dropin_sklearn import Lasso, LassoCV, LogisticRegression
 from celer.utils.testing import build_dataset
 
@@ -185,6 +187,98 @@ def test_celer_single_alpha(sparse_X, pb):
     np.testing.assert_array_less(gaps, tol)
 
 
+@pytest.mark.parametrize("sparse_X, pb, positive, zero_init",
+                         [(sparse_X, pb, False, zero_init) for sparse_X, pb,
+                          zero_init in product([True, False],
+                                               ["lasso", "logreg"],
+                                               [True, False])] +
+                         [(True, "lasso", True, False),
+                          (False, "lasso", True, True)])
+def test_celer_path_above_alpha_max(sparse_X, pb, positive, zero_init):
+    X, y, _, _ = build_dataset(n_samples=20, n_features=100, sparse_X=sparse_X)
+    n_samples, n_features = X.shape
+    if pb == "logreg":
+        y = np.sign(y)
+        dual_scale = 2.
+    else:
+        dual_scale = n_samples
+    Xty = X.T.dot(y)
+    alpha_max = (np.max(Xty) if positive else norm(Xty, ord=np.inf)) / \
+        dual_scale
+
+    alphas = alpha_max * np.array([10., 2., 1., 0.1])
+    coef_init = np.zeros(n_features) if zero_init else None
+    tol = 1e-8
+    _, coefs, gaps, thetas = celer_path(
+        X, y, pb, alphas=alphas, tol=tol, return_thetas=True,
+        positive=positive, coef_init=coef_init)
+    np.testing.assert_equal(coefs[:, :3], 0.)
+    np.testing.assert_array_less(gaps, tol)
+    # the solver is skipped and the dual point is y / (dual_scale * alpha)
+    np.testing.assert_allclose(
+        thetas[:3], y / (dual_scale * alphas[:3, None]), rtol=1e-12)
+    # dual points are feasible
+    Xt_thetas = X.T @ thetas.T
+    if not positive:
+        Xt_thetas = np.abs(Xt_thetas)
+    np.testing.assert_array_less(np.max(Xt_thetas, axis=0), 1 + 1e-12)
+
+
+@pytest.mark.parametrize("sparse_X", [True, False])
+def test_celer_path_no_alpha(sparse_X):
+    X, y, _, _ = build_dataset(n_samples=20, n_features=30, sparse_X=sparse_X)
+    alphas, coefs, gaps = celer_path(X, y, "lasso", alphas=[])
+    np.testing.assert_equal(alphas.shape, (0,))
+    np.testing.assert_equal(coefs.shape, (30, 0))
+    np.testing.assert_equal(gaps.shape, (0,))
+
+
+@pytest.mark.parametrize("sparse_X, dtype, negative",
+                         product([True, False], [np.float32, np.float64],
+                                 [True, False]))
+def test_compute_dnorm_Xty(sparse_X, dtype, negative):
+    X, y, _, _ = build_dataset(n_samples=20, n_features=30, sparse_X=sparse_X)
+    if negative:
+        # all X_j^T y are negative
+        X = np.abs(X.toarray() if sparse_X else X) + 1.
+        y = - np.ones(20)
+    X = X.astype(dtype)
+    y = y.astype(dtype)
+    Xty = X.T @ y
+
+    if sparse_X:
+        X = sparse.csc_matrix(X)
+        args = (np.empty([1, 1], order='F', dtype=dtype), X.data, X.indices,
+                X.indptr)
+    else:
+        args = (np.asfortranarray(X), np.empty([1], dtype=dtype),
+                np.empty([1], dtype=np.int32), np.empty([1], dtype=np.int32))
+
+    rtol = 1e-5 if dtype == np.float32 else 1e-7
+    np.testing.assert_allclose(
+        compute_dnorm_Xty(sparse_X, y, *args, False), norm(Xty, ord=np.inf),
+        rtol=rtol)
+    np.testing.assert_allclose(
+        compute_dnorm_Xty(sparse_X, y, *args, True), np.max(Xty), rtol=rtol)
+
+
+@pytest.mark.parametrize("sparse_X, pb, positive",
+                         [(True, "lasso", False), (False, "lasso", False),
+                          (True, "lasso", True), (False, "logreg", False)])
+def test_celer_path_alphas_coef_init(sparse_X, pb, positive):
+    # alpha_max does not depend on coef_init
+    X, y, _, _ = build_dataset(n_samples=20, n_features=30, sparse_X=sparse_X)
+    if pb == "logreg":
+        y = np.sign(y)
+    coef_init = np.zeros(X.shape[1])
+    coef_init[0] = 1.
+    alphas = celer_path(
+        X, y, pb, n_alphas=3, positive=positive, tol=1e-4)[0]
+    alphas_init = celer_path(X, y, pb, n_alphas=3, positive=positive,
+                             coef_init=coef_init, tol=1e-4)[0]
+    np.testing.assert_allclose(alphas, alphas_init)
+
+
 @pytest.mark.parametrize("sparse_X", [True, False])
 def test_zero_column(sparse_X):
     X, y, _, _ = build_dataset(n_samples=60, n_features=50, sparse_X=sparse_X)
@@ -2,6 +2,7 @@ import pytest
 import itertools
 import numpy as np
 from numpy.linalg import norm
+from scipy import sparse
 
 from sklearn.utils.estimator_checks import check_estimator
 from sklearn.linear_model import MultiTaskLassoCV as sklearn_MultiTaskLassoCV
@@ -10,7 +11,9 @@ from sklearn.linear_model import lasso_path
 
 from celer import (Lasso, GroupLasso, GroupLassoCV, MultiTaskLasso,
                    MultiTaskLassoCV)
-from celer.homotopy import celer_path, mtl_path, _grp_converter
+from celer.homotopy import (celer_path, mtl_path, _grp_converter,
+                            _compute_norms_X_grp, _sparse_grp_norm,
+                            MAX_GRAM_GRP_SIZE)
 from celer.group_fast import dscal_grp
 from celer.utils.testing import build_dataset
 
@@ -165,6 +168,71 @@ def test_group_lasso_path(sparse_X):
     check_estimator(GroupLasso)
 
 
+@pytest.mark.parametrize("groups", [[[0, 1], [], [2, 3]], [[0, 1], [2, 3], []],
+                                    [2, 0, 2]])
+def test_grp_converter_empty_group(groups):
+    with pytest.raises(ValueError, match="must not be empty"):
+        _grp_converter(groups, 4)
+
+
+def test_norms_X_grp_duplicate_entries():
+    # non canonical CSC matrix: column 0 has two entries in row 0
+    X = sparse.csc_matrix(
+        (np.array([1., 1., 3.]), np.array([0, 0, 1], dtype=np.int32),
+         np.array([0, 2, 3], dtype=np.int32)), shape=(2, 2))
+    grp_ptr, grp_indices = _grp_converter(1, 2)
+    X_sparse_scaling = np.zeros(2)
+    X_col_sums = np.asarray(X.sum(axis=0)).ravel()
+
+    norms_X_grp = _compute_norms_X_grp(
+        X, grp_ptr, grp_indices, X_sparse_scaling, X_col_sums, 0, 2)
+    np.testing.assert_allclose(norms_X_grp, [2., 3.])
+
+
+@pytest.mark.parametrize("n_samples", [1, 40])
+def test_sparse_grp_norm(n_samples):
+    # iterative norm of a large sparse centered group vs dense computation
+    size_g = MAX_GRAM_GRP_SIZE + 10
+    X = sparse.random(n_samples, 2 * size_g, density=0.1, format='csc',
+                      random_state=0)
+    X_sparse_scaling = np.random.RandomState(0).rand(2 * size_g)
+    X_centered = X.toarray() - X_sparse_scaling
+
+    np.testing.assert_allclose(
+        _sparse_grp_norm(X, X_sparse_scaling), norm(X_centered, ord=2))
+    # ARPACK starts from a fixed vector: the result is reproducible
+    np.testing.assert_equal(_sparse_grp_norm(X, X_sparse_scaling),
+                            _sparse_grp_norm(X, X_sparse_scaling))
+    # wide and tall groups
+    np.testing.assert_allclose(
+        _sparse_grp_norm(X.T.tocsc(), X_sparse_scaling[:n_samples]),
+        norm(X.T.toarray() - X_sparse_scaling[:n_samples], ord=2))
+
+    grp_ptr, grp_indices = _grp_converter([size_g, size_g], 2 * size_g)
+    X_col_sums = np.asarray(X.sum(axis=0)).ravel()
+    norms_X_grp = _compute_norms_X_grp(
+        X, grp_ptr, grp_indices, X_sparse_scaling, X_col_sums, 0, 2)
+    np.testing.assert_allclose(
+        norms_X_grp, [norm(X_centered[:, :size_g], ord=2),
+                      norm(X_centered[:, size_g:], ord=2)])
+
+
+@pytest.mark.parametrize("sparse_X", [True, False])
+def test_group_lasso_path_n_jobs(sparse_X):
+    # group norms computed in parallel must not change the path
+    X, y = build_dataset(n_samples=30, n_features=60, sparse_X=sparse_X)[:2]
+    groups = [[0, 5, 7], [1, 2], [3, 4, 6], list(range(8, 20))] + \
+        [[j] for j in range(20, 60)]
+
+    alphas, coefs, gaps = celer_path(
+        X, y, "grouplasso", groups=groups, n_alphas=5, tol=1e-8)
+    alphas_par, coefs_par, gaps_par = celer_path(
+        X, y, "grouplasso", groups=groups, n_alphas=5, tol=1e-8, n_jobs=2)
+
+    np.testing.assert_allclose(alphas, alphas_par)
+    np.testing.assert_allclose(coefs, coefs_par)
+
+
 @pytest.mark.parametrize("sparse_X", [True, False])
 def test_GroupLasso(sparse_X):
     n_features = 50